@@ -1,15 +1,22 @@
-import json
+import asyncio
+import hashlib
 import os
+import shutil
 import sys
+import threading
 import time
 import traceback
+from collections import OrderedDict
 from dataclasses import dataclass
 from datetime import datetime, timezone
+from functools import partial
+from operator import attrgetter
 from pathlib import Path
-from typing import Dict, List, Optional, Set
-from urllib.parse import parse_qs, urlparse
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import unquote_plus
 
 import httpx
+import libipld
 import orjson
 import undetected_chromedriver as uc
 from atproto import Client, models
@@ -17,18 +24,21 @@ from auto_download_undetected_chromedriver import (
     download_undetected_chromedriver,
 )
 from PySide6.QtCore import (
-    QMutex,
-    QMutexLocker,
+    QAbstractTableModel,
+    QModelIndex,
     QObject,
+    QRunnable,
+    QSize,
     Qt,
     QThread,
+    QThreadPool,
+    QTimer,
     Signal,
     Slot,
 )
-from PySide6.QtGui import QPixmap
+from PySide6.QtGui import QImage, QPixmap
 from PySide6.QtWidgets import (
     QApplication,
-    QCheckBox,
     QDialog,
     QHBoxLayout,
     QHeaderView,
@@ -39,8 +49,7 @@ from PySide6.QtWidgets import (
     QProgressBar,
     QPushButton,
     QStatusBar,
-    QTableWidget,
-    QTableWidgetItem,
+    QTableView,
     QVBoxLayout,
     QWidget,
 )
@@ -51,8 +60,14 @@ chromedriver_path = download_undetected_chromedriver(
     folder_path_for_exe=os.path.dirname(os.path.abspath(__file__))
 )
 
+# Shared by all avatar downloads so they reuse pooled connections
+_AVATAR_CLIENT = httpx.Client(
+    timeout=10,
+    limits=httpx.Limits(max_keepalive_connections=16, max_connections=32),
+)
+
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class UserMapping:
     twitter_username: str
     atproto_username: str
@@ -61,6 +76,35 @@ class UserMapping:
     did: str
 
 
+class ChromeDriverError(Exception):
+    """Raised when the Chrome driver cannot be started"""
+
+    pass
+
+
+def _utcnow_z() -> str:
+    """Return the current UTC time as an ISO 8601 timestamp ending in Z."""
+    # isoformat skips the locale handling strftime goes through
+    return (
+        datetime.now(tz=timezone.utc)
+        .isoformat(timespec='seconds')
+        .replace('+00:00', 'Z')
+    )
+
+
+def screen_name_from_url(url: str) -> Optional[str]:
+    """Return the `screen_name` query parameter of a URL, if present."""
+    # Cheaper than a full urlparse + parse_qs for the one parameter we need
+    start = url.find('?screen_name=')
+    if start < 0:
+        start = url.find('&screen_name=')
+        if start < 0:
+            return None
+    value = url[start + len('?screen_name=') :].partition('#')[0]
+    value = value.partition('&')[0]
+    return unquote_plus(value) if value else None
+
+
 class LoginDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent)
@@ -95,76 +139,296 @@ class LoginDialog(QDialog):
         self.password_input.setText(os.getenv('BLUESKY_PASSWORD', ''))
 
 
+class LRUCache(OrderedDict):
+    """Dict that evicts the least recently used entry beyond `capacity`."""
+
+    def __init__(self, capacity: int):
+        super().__init__()
+        self.capacity = capacity
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def put(self, key, value) -> None:
+        self[key] = value
+        self.move_to_end(key)
+        if len(self) > self.capacity:
+            self.popitem(last=False)
+
+
+class AvatarSignals(QObject):
+    loaded = Signal(str, QImage)  # url, scaled image
+    failed = Signal(str)  # url
+
+
+class AvatarLoader(QRunnable):
+    """Load an avatar from disk or download and scale it, off the GUI thread."""
+
+    def __init__(
+        self,
+        url: str,
+        cache_path: Path,
+        http_client: httpx.Client,
+        signals: AvatarSignals,
+    ):
+        super().__init__()
+        self.url = url
+        self.cache_path = cache_path
+        self.http_client = http_client
+        self.signals = signals
+
+    def run(self) -> None:
+        # QPixmap may only be used on the GUI thread, so decode to a QImage
+        if self.cache_path.exists():
+            image = QImage(str(self.cache_path))
+            if not image.isNull():
+                self.signals.loaded.emit(self.url, image)
+                return
+
+        image = None
+        try:
+            response = self.http_client.get(self.url)
+            response.raise_for_status()
+            if response.headers.get('Content-Type', '').startswith('image/'):
+                image = QImage.fromData(response.content)
+        except httpx.RequestError as e:
+            print(f'Network error fetching avatar: {e}')
+        except Exception as e:
+            print(f'Error fetching avatar: {e}')
+
+        if image is None or image.isNull():
+            self.signals.failed.emit(self.url)
+            return
+        image = image.scaled(
+            50,
+            50,
+            aspectMode=Qt.AspectRatioMode.KeepAspectRatio,
+            mode=Qt.TransformationMode.SmoothTransformation,
+        )
+        # Keep the scaled avatar so later runs skip the download
+        temp_path = self.cache_path.with_suffix('.tmp')
+        if image.save(str(temp_path), 'PNG'):
+            os.replace(temp_path, self.cache_path)
+        self.signals.loaded.emit(self.url, image)
+
+
+# The mapper's caches are confined to the worker thread: process_users and
+# the asyncio loops it runs are their only readers and writers, and the GUI
+# only ever sees copies carried by the mapper's signals, so no locking is
+# needed around them.
 class TwitterBlueskyMapper(QObject):
+    # Rewrite the caches after this many Twitter lookups; updates in
+    # between are only appended to each cache's journal.
+    CACHE_FLUSH_INTERVAL = 64
+    # Delay between cache rewrites while looking up Bluesky users
+    CACHE_FLUSH_DELAY = 2  # seconds
+    # Poll the performance log instead of sleeping a fixed time per user
+    TWITTER_POLL_ATTEMPTS = 10
+    TWITTER_POLL_INTERVAL = 0.1  # seconds
+    # Maximum number of concurrent ATProto lookups
+    ATPROTO_CONCURRENCY = 8
+    # Maximum number of concurrent HTTP requests resolving user links
+    REDIRECT_CONCURRENCY = 32
+    # Number of user links tried over HTTP before deciding whether to go on
+    REDIRECT_PROBE_SIZE = 8
+    # Maximum number of actors accepted by app.bsky.actor.getProfiles
+    PROFILES_BATCH_SIZE = 25
+    # Unauthenticated AppView endpoint used for profile lookups
+    PUBLIC_API_URL = 'https://public.api.bsky.app/xrpc/'
+    # Maximum number of resolved Twitter users waiting for a Bluesky lookup
+    LOOKUP_QUEUE_SIZE = 256
+    # Longest time a resolved user waits for others to fill its lookup batch
+    LOOKUP_BATCH_LINGER = 5  # seconds
+    # Walk the whole follow list again after this long to catch unfollows
+    FOLLOWED_REFRESH_INTERVAL = 24 * 60 * 60  # seconds
+
     new_mapping = Signal(UserMapping)
-    error_occurred = Signal(str, str)  # message, level
-    progress_update = Signal(int, int)  # current, total
+    status_message = Signal(str)
+    error_occurred = Signal(str)
     mapping_complete = Signal()
     critical_error_occurred = Signal(str)
+    followed_updated = Signal(object)  # set of followed DIDs
 
     def __init__(
         self,
+        follow_client: Client,
         cache_dir: str = 'cache',
-        login: str = '',
-        password: str = '',
         input_file: str = '',
     ):
         super().__init__()
-        self.client = None
+        # The GUI's logged in session, only used to read the follow list.
+        # Sharing it with the worker thread is safe: atproto's Client
+        # serializes session refreshes behind its own lock, and the
+        # underlying httpx.Client is thread-safe.
+        self.follow_client = follow_client
         self.cache_dir = Path(cache_dir)
         self.cache_dir.mkdir(exist_ok=True)
-        self.twitter_cache_file = self.cache_dir / 'twitter_cache.json'
-        self.bluesky_cache_file = self.cache_dir / 'bluesky_cache.json'
+        self.twitter_cache_file = self.cache_dir / 'twitter_cache.cbor'
+        self.bluesky_cache_file = self.cache_dir / 'bluesky_cache.cbor'
         self.twitter_cache: Dict[str, str] = self._load_cache(
             self.twitter_cache_file
         )
         self.bluesky_cache: Dict[str, dict] = self._load_cache(
             self.bluesky_cache_file
         )
-        self.twitter_mutex = QMutex()
-        self.bluesky_mutex = QMutex()
-        self.login = login
-        self.password = password
+        # Number of cache updates not yet written to the cache files
+        self._twitter_dirty = 0
+        self._bluesky_dirty = 0
+        # Cache files already backed up by this run
+        self._backed_up: Set[Path] = set()
         self.input_file = input_file
+        # Work done and known so far, across both stages of the pipeline.
+        # Polled by the GUI instead of being signalled for every user.
+        self._progress_lock = threading.Lock()
+        self._progress_done = 0
+        self._progress_total = 0
+        # Only started when a user link can't be resolved over plain HTTP
+        self.driver: Optional[uc.Chrome] = None
 
     def _load_cache(self, cache_file: Path) -> dict:
-        """Load cache from file."""
+        """Load cache from file, replaying any journaled updates."""
+        data = {}
+        legacy_file = cache_file.with_suffix('.json')
         if cache_file.exists():
             try:
-                return json.loads(cache_file.read_text())
-            except json.JSONDecodeError:
+                data = libipld.decode_dag_cbor(cache_file.read_bytes())
+            except ValueError:
+                data = None
+            # Garbage can still decode, to something other than a map
+            if not isinstance(data, dict):
                 print(
                     f'Warning: Cache file {cache_file} is corrupted. Starting fresh.'
                 )
-        return {}
+                data = {}
+        elif legacy_file.exists():
+            # One-time migration from the old JSON cache format
+            try:
+                data = orjson.loads(legacy_file.read_bytes())
+                if not isinstance(data, dict):
+                    raise ValueError('not a JSON object')
+                cache_file.write_bytes(libipld.encode_dag_cbor(data))
+                legacy_file.unlink()
+            except ValueError:
+                print(
+                    f'Warning: Cache file {legacy_file} is corrupted. Starting fresh.'
+                )
+                data = {}
+        journal_file = cache_file.with_suffix('.ndjson')
+        if journal_file.exists():
+            for line in journal_file.read_bytes().splitlines():
+                try:
+                    entry = orjson.loads(line)
+                except orjson.JSONDecodeError:
+                    # A crash mid-append leaves a truncated last line
+                    break
+                if not isinstance(entry, dict):
+                    print(
+                        f'Warning: Journal {journal_file} is corrupted. Ignoring the rest of it.'
+                    )
+                    break
+                data.update(entry)
+        return data
 
     def _save_cache(self, cache_file: Path, data: dict) -> None:
-        """Save cache to file."""
-        cache_file.write_text(json.dumps(data, indent=2))
+        """Save cache to file and discard its journal."""
+        # Write to a temporary file first so a crash can't truncate the cache
+        tmp_file = cache_file.with_suffix('.tmp')
+        tmp_file.write_bytes(libipld.encode_dag_cbor(data))
+        # Keep the version this run started from around for recovery. It is
+        # copied, not moved, so the cache file is never missing while it is
+        # replaced, and only once since the flush loop saves every few seconds.
+        if cache_file not in self._backed_up:
+            if cache_file.exists():
+                shutil.copyfile(
+                    cache_file, cache_file.with_name(f'{cache_file.name}.bak')
+                )
+            self._backed_up.add(cache_file)
+        os.replace(tmp_file, cache_file)
+        cache_file.with_suffix('.ndjson').unlink(missing_ok=True)
+
+    def _journal_cache_entry(self, cache_file: Path, key: str, value) -> None:
+        """Append a single cache update to the cache's journal."""
+        with cache_file.with_suffix('.ndjson').open('ab') as journal:
+            journal.write(orjson.dumps({key: value}) + b'\n')
+
+    def _cache_twitter_username(
+        self, user_link: str, username: Optional[str]
+    ) -> None:
+        """Store a Twitter username, flushing the caches periodically."""
+        self.twitter_cache[user_link] = username
+        self._twitter_dirty += 1
+        self._journal_cache_entry(self.twitter_cache_file, user_link, username)
+        if self._twitter_dirty >= self.CACHE_FLUSH_INTERVAL:
+            self.flush_caches()
+
+    def _cache_bluesky_info(self, twitter_username: str, data: dict) -> None:
+        """Store ATProto user information, written out by the flush loop."""
+        self.bluesky_cache[twitter_username] = data
+        self._bluesky_dirty += 1
+        self._journal_cache_entry(
+            self.bluesky_cache_file, twitter_username, data
+        )
 
-    @staticmethod
-    def load_user_entries(file_path: str) -> List[Dict]:
-        """Load user entries from JSON file."""
-        with open(file_path, 'r') as file:
-            return orjson.loads(file.read())
+    def flush_caches(self) -> None:
+        """Write any pending cache updates to the cache files."""
+        if self._twitter_dirty:
+            self._save_cache(self.twitter_cache_file, self.twitter_cache)
+            self._twitter_dirty = 0
+        if self._bluesky_dirty:
+            self._save_cache(self.bluesky_cache_file, self.bluesky_cache)
+            self._bluesky_dirty = 0
+
+    async def _flush_loop(self) -> None:
+        """Periodically write pending cache updates during the async lookups."""
+        while True:
+            await asyncio.sleep(self.CACHE_FLUSH_DELAY)
+            self.flush_caches()
 
-    def get_twitter_username(
+    @staticmethod
+    def load_user_links(file_path: str) -> List[str]:
+        """Load the user links out of the following JSON file."""
+        # Decoding the whole export is cheap with orjson and validates it,
+        # so a malformed file fails here instead of yielding no links
+        entries = orjson.loads(Path(file_path).read_bytes())
+        if not isinstance(entries, list):
+            raise ValueError(f'{file_path} does not hold a list of follows')
+        user_links = []
+        for entry in entries:
+            following = entry.get('following') if isinstance(entry, dict) else None
+            if not isinstance(following, dict):
+                raise ValueError(f'{file_path} has an invalid entry: {entry!r}')
+            user_link = following.get('userLink')
+            if user_link:
+                user_links.append(user_link)
+        if entries and not user_links:
+            raise ValueError(f'{file_path} has no userLink entries')
+        return user_links
+
+    def _scrape_twitter_username(
         self, driver: uc.Chrome, user_link: str
     ) -> Optional[str]:
-        """Get Twitter username from user link with caching."""
-        # Check cache first
-        with QMutexLocker(self.twitter_mutex):
-            if user_link in self.twitter_cache:
-                return self.twitter_cache[user_link]
-
-        try:
-            driver.get(user_link)
-            time.sleep(0.8)
+        """Load the user link and wait for the in-page redirect to a profile."""
+        # Discard what is left over from the previous link, a late redirect
+        # there must not be taken for this link's profile
+        driver.get_log('performance')
+        driver.get(user_link)
+        for _ in range(self.TWITTER_POLL_ATTEMPTS):
             logs = driver.get_log('performance')
-            username = None
 
             for entry in logs:
-                message = json.loads(entry['message'])
+                message_raw = entry['message']
+                # Most entries are unrelated, skip them without decoding.
+                # Network entries often carry a screen_name, so the method
+                # is checked first to reject them in a single scan.
+                if (
+                    '"Page.navigatedWithinDocument"' not in message_raw
+                    or 'screen_name=' not in message_raw
+                ):
+                    continue
+                message = orjson.loads(message_raw)
                 method = message['message']['method']
 
                 if method != 'Page.navigatedWithinDocument':
@@ -175,94 +439,459 @@ class TwitterBlueskyMapper(QObject):
                 if 'url' not in message_params:
                     continue
 
-                current_url = message_params['url']
-                parsed_url = urlparse(current_url)
-                query_params = parse_qs(parsed_url.query)
+                username = screen_name_from_url(message_params['url'])
+                if username:
+                    return username
 
-                if 'screen_name' in query_params:
-                    username = query_params['screen_name'][0]
+            time.sleep(self.TWITTER_POLL_INTERVAL)
+        return None
+
+    async def _resolve_twitter_redirect(
+        self, http_client: httpx.AsyncClient, user_link: str
+    ) -> Optional[str]:
+        """Find the screen name in the HTTP redirects of the user link."""
+        try:
+            # Streaming stops httpx from downloading the final page body
+            async with http_client.stream('GET', user_link) as response:
+                for url in [
+                    *(hop.headers.get('location', '') for hop in response.history),
+                    str(response.url),
+                ]:
+                    username = screen_name_from_url(url)
                     if username:
-                        # Cache the result
-                        with QMutexLocker(self.twitter_mutex):
-                            self.twitter_cache[user_link] = username
-                            self._save_cache(
-                                self.twitter_cache_file, self.twitter_cache
-                            )
                         return username
+        except httpx.HTTPError as e:
+            print(f'Network error resolving {user_link}: {e}')
+        return None
+
+    async def resolve_links(self, user_links: List[str]) -> Set[str]:
+        """Resolve user links over HTTP concurrently, caching what is found.
+
+        Returns the links that were resolved, they already count as done.
+        """
+        semaphore = asyncio.Semaphore(self.REDIRECT_CONCURRENCY)
+        resolved = set()
+        async with httpx.AsyncClient(
+            timeout=10, follow_redirects=True
+        ) as http_client:
+
+            async def resolve(user_link: str) -> None:
+                async with semaphore:
+                    if self._interruption_requested():
+                        return
+                    username = await self._resolve_twitter_redirect(
+                        http_client, user_link
+                    )
+                # Misses are left uncached for Chrome to retry
+                if username:
+                    self._cache_twitter_username(user_link, username)
+                    resolved.add(user_link)
+                    self._advance_progress(done=1)
+
+            # Twitter mostly redirects with JavaScript, so only go through
+            # all links if some of the first ones resolve over plain HTTP
+            probe = user_links[: self.REDIRECT_PROBE_SIZE]
+            await asyncio.gather(
+                *(resolve(user_link) for user_link in probe),
+                return_exceptions=True,
+            )
+            if resolved:
+                await asyncio.gather(
+                    *(
+                        resolve(user_link)
+                        for user_link in user_links[self.REDIRECT_PROBE_SIZE :]
+                    ),
+                    return_exceptions=True,
+                )
+        return resolved
+
+    def _get_driver(self) -> uc.Chrome:
+        """Start the Chrome driver on first use."""
+        if self.driver is None:
+            options = uc.ChromeOptions()
+            options.headless = True
+            options.add_argument('--no-sandbox')
+            options.add_argument('--disable-dev-shm-usage')
+            options.add_argument('--disable-gpu')
+            options.add_argument('--disable-extensions')
+            # Enable performance logging
+            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+            try:
+                self.driver = uc.Chrome(
+                    driver_executable_path=chromedriver_path,
+                    options=options,
+                    use_subprocess=True,
+                    version_main=130,
+                )
+            except Exception as e:
+                raise ChromeDriverError(str(e)) from e
+        return self.driver
 
-            with QMutexLocker(self.twitter_mutex):
-                self.twitter_cache[user_link] = username
-                self._save_cache(self.twitter_cache_file, self.twitter_cache)
+    async def get_twitter_username(self, user_link: str) -> Optional[str]:
+        """Get Twitter username from user link with caching."""
+        # Check cache first
+        if user_link in self.twitter_cache:
+            return self.twitter_cache[user_link]
+
+        try:
+            # Links resolvable over HTTP were cached by resolve_links, the
+            # rest are redirected by Twitter's JavaScript, so use Chrome.
+            # Chrome blocks, so it runs off the event loop while the
+            # Bluesky lookups carry on; the cache stays on the loop thread.
+            driver = await asyncio.to_thread(self._get_driver)
+            username = await asyncio.to_thread(
+                self._scrape_twitter_username, driver, user_link
+            )
+            # Cache the result
+            self._cache_twitter_username(user_link, username)
             return username
+        except ChromeDriverError:
+            raise
         except Exception as e:
             error_message = f"Error fetching Twitter username for {user_link}: {e}\n{traceback.format_exc()}"
             print(error_message)  # Print for debugging
-            self.error_occurred.emit(error_message, 'error')
+            self.error_occurred.emit(error_message)
             return None
-        return None
 
-    def get_atproto_user_info(self, twitter_username: str) -> Optional[dict]:
+    @staticmethod
+    def _user_info(actor: dict) -> dict:
+        """Extract the cached fields from an ATProto profile view."""
+        return {
+            'did': actor['did'],
+            'handle': actor['handle'],
+            'avatar': actor.get('avatar'),
+            'description': actor.get('description'),
+            'screen_name': actor.get('displayName'),
+        }
+
+    async def get_bsky_social_profiles(
+        self, http_client: httpx.AsyncClient, twitter_usernames: List[str]
+    ) -> Dict[str, dict]:
+        """Get users whose Twitter username is also their bsky.social handle."""
+        # Underscores are valid on Twitter but not in handles
+        candidates = {
+            f'{twitter_username.lower()}.bsky.social': twitter_username
+            for twitter_username in twitter_usernames
+            if '_' not in twitter_username
+        }
+        handles = list(candidates)
+        found = {}
+        for start in range(0, len(handles), self.PROFILES_BATCH_SIZE):
+            batch = handles[start : start + self.PROFILES_BATCH_SIZE]
+            try:
+                response = await http_client.get(
+                    'app.bsky.actor.getProfiles', params={'actors': batch}
+                )
+                response.raise_for_status()
+                profiles = orjson.loads(response.content)['profiles']
+            except Exception as e:
+                # The users of this batch are looked up by searching instead
+                print(f'Error fetching ATProto profiles: {e}')
+                continue
+            for actor in profiles:
+                twitter_username = candidates.get(actor['handle'])
+                if twitter_username is None:
+                    continue
+                data = self._user_info(actor)
+                self._cache_bluesky_info(twitter_username, data)
+                found[twitter_username] = data
+        return found
+
+    async def get_atproto_user_info(
+        self, http_client: httpx.AsyncClient, twitter_username: str
+    ) -> Optional[dict]:
         """Get ATProto user information with caching."""
         # Check cache first
-        with QMutexLocker(self.bluesky_mutex):
-            if twitter_username in self.bluesky_cache:
-                return self.bluesky_cache[twitter_username]
+        if twitter_username in self.bluesky_cache:
+            return self.bluesky_cache[twitter_username]
 
         try:
             handle = f'{twitter_username}'
             print(f'Fetching ATProto info for {twitter_username}...')
-            profile = self.client.app.bsky.actor.search_actors(
-                params={'q': handle, 'limit': 1}
+            response = await http_client.get(
+                'app.bsky.actor.searchActors', params={'q': handle, 'limit': 1}
             )
+            response.raise_for_status()
+            actors = orjson.loads(response.content)['actors']
 
             data = {}
-            if profile['actors']:
-                actor = profile['actors'][0]
+            if actors:
+                actor = actors[0]
 
                 # compare handles
-                if actor.handle != handle:
-                    bsky_handle = actor.handle.split('.')[0] if '.bsky' in actor.handle else actor.handle
+                if actor['handle'] != handle:
+                    bsky_handle = actor['handle'].split('.')[0] if '.bsky' in actor['handle'] else actor['handle']
 
-                    threshold = 75 if '.bsky' in actor.handle else 55 # Lower threshold for custom domains
+                    threshold = 75 if '.bsky' in actor['handle'] else 55 # Lower threshold for custom domains
 
-                    match_percent = fuzz.ratio(bsky_handle, handle)
-                    if match_percent < threshold:
+                    match_percent = fuzz.ratio(
+                        bsky_handle, handle, score_cutoff=threshold
+                    )
+                    if not match_percent:
                         # Not a good match
                         return None
 
 
-                data = {
-                    'did': actor.did,
-                    'handle': actor.handle,
-                    'avatar': actor.avatar,
-                    'description': actor.description,
-                    'screen_name': actor.display_name,
-                }
+                data = self._user_info(actor)
 
             # Cache the result
-            with QMutexLocker(self.bluesky_mutex):
-                self.bluesky_cache[twitter_username] = data
-                self._save_cache(self.bluesky_cache_file, self.bluesky_cache)
+            self._cache_bluesky_info(twitter_username, data)
             return data
         except Exception as e:
             error_message = f"Error fetching ATProto info for {twitter_username}: {e}\n{traceback.format_exc()}"
             print(error_message)
-            self.error_occurred.emit(error_message, 'error')
+            self.error_occurred.emit(error_message)
             return None
 
-    def current_followed(self) -> Set[str]:
-        """Get the set of currently followed users."""
+    @staticmethod
+    def _interruption_requested() -> bool:
+        """Whether the GUI asked the worker thread to stop."""
+        return QThread.currentThread().isInterruptionRequested()
+
+    def _advance_progress(self, done: int = 0, total: int = 0) -> None:
+        """Add to the work done and known so far on the links and lookups."""
+        with self._progress_lock:
+            self._progress_done += done
+            self._progress_total += total
+
+    def progress(self) -> Tuple[int, int]:
+        """Return the work done and the total known so far, from any thread."""
+        with self._progress_lock:
+            return self._progress_done, self._progress_total
+
+    async def _map_users(self, user_links: List[str]) -> bool:
+        """Resolve user links and look the users up on Bluesky as they come."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.LOOKUP_QUEUE_SIZE)
+        # Profile lookups need no session, so no login is needed here
+        async with httpx.AsyncClient(
+            base_url=self.PUBLIC_API_URL, timeout=10
+        ) as http_client:
+            flush_task = asyncio.create_task(self._flush_loop())
+            consumer = asyncio.create_task(
+                self._consume_twitter_usernames(http_client, queue)
+            )
+            try:
+                try:
+                    await self._produce_twitter_usernames(user_links, queue)
+                except ChromeDriverError as e:
+                    error_message = f"Error initializing Chrome driver: {e}\n{traceback.format_exc()}"
+                    print(error_message)
+                    self.critical_error_occurred.emit(error_message)
+                    return False
+                if self._interruption_requested():
+                    return False
+                # No more users will be queued
+                await queue.put(None)
+                await consumer
+                # Lookups cut short by an interruption leave the mapping partial
+                return not self._interruption_requested()
+            finally:
+                consumer.cancel()
+                flush_task.cancel()
+
+    async def _produce_twitter_usernames(
+        self, user_links: List[str], queue: asyncio.Queue
+    ) -> None:
+        """Resolve user links, queueing users without cached Bluesky info."""
+        unresolved_links = [
+            user_link
+            for user_link in user_links
+            if user_link not in self.twitter_cache
+        ]
+        resolved_links: Set[str] = set()
+        if unresolved_links:
+            self.status_message.emit('Resolving Twitter usernames...')
+            resolved_links = await self.resolve_links(unresolved_links)
+            if self._interruption_requested():
+                return
+
+        queued = set()
+        for user_link in user_links:
+            if self._interruption_requested():
+                break
+            twitter_username = await self.get_twitter_username(user_link)
+            if twitter_username:
+                # Emit mapping with Twitter username and any cached atproto data
+                bluesky_info = self.bluesky_cache.get(twitter_username)
+                self.new_mapping.emit(
+                    self._make_mapping(twitter_username, bluesky_info)
+                )
+                if bluesky_info is None and twitter_username not in queued:
+                    queued.add(twitter_username)
+                    self._advance_progress(total=1)
+                    await queue.put(twitter_username)
+
+            if user_link not in resolved_links:
+                self._advance_progress(done=1)
+        if self.driver is not None:
+            await asyncio.to_thread(self.driver.quit)
+            self.driver = None
+
+    async def _consume_twitter_usernames(
+        self, http_client: httpx.AsyncClient, queue: asyncio.Queue
+    ) -> None:
+        """Look up queued users on Bluesky until the sentinel arrives."""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.ATPROTO_CONCURRENCY)
+        lookups = []
+        finished = False
+        while not finished:
+            # Chrome resolves one user at a time, so wait a little for more
+            # users to share the batched getProfiles request
+            batch = [await queue.get()]
+            deadline = loop.time() + self.LOOKUP_BATCH_LINGER
+            while (
+                batch[-1] is not None
+                and len(batch) < self.PROFILES_BATCH_SIZE
+            ):
+                if not queue.empty():
+                    batch.append(queue.get_nowait())
+                    continue
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                get = asyncio.ensure_future(queue.get())
+                await asyncio.wait({get}, timeout=timeout)
+                # A cancelled get leaves its item in the queue
+                if get.cancel():
+                    break
+                batch.append(get.result())
+            if batch[-1] is None:
+                batch.pop()
+                finished = True
+            if batch:
+                lookups.append(
+                    asyncio.create_task(
+                        self._map_atproto_users(http_client, semaphore, batch)
+                    )
+                )
+        await asyncio.gather(*lookups)
+
+    async def _map_atproto_users(
+        self,
+        http_client: httpx.AsyncClient,
+        semaphore: asyncio.Semaphore,
+        twitter_usernames: List[str],
+    ) -> None:
+        """Look up the given users and emit a mapping for each one found."""
+
+        def emit_mapping(twitter_username: str, data: Optional[dict]) -> None:
+            if data:
+                # Update the mapping
+                self.new_mapping.emit(
+                    self._make_mapping(twitter_username, data)
+                )
+            self._advance_progress(done=1)
+
+        # Exact handle matches are fetched in batches, only the rest are
+        # searched for one at a time
+        async with semaphore:
+            found = await self.get_bsky_social_profiles(
+                http_client, twitter_usernames
+            )
+        for twitter_username, data in found.items():
+            emit_mapping(twitter_username, data)
+
+        async def resolve(twitter_username: str) -> None:
+            async with semaphore:
+                if self._interruption_requested():
+                    return
+                data = await self.get_atproto_user_info(
+                    http_client, twitter_username
+                )
+            emit_mapping(twitter_username, data)
+
+        await asyncio.gather(
+            *(
+                resolve(twitter_username)
+                for twitter_username in twitter_usernames
+                if twitter_username not in found
+            ),
+            return_exceptions=True,
+        )
+
+    @staticmethod
+    def _make_mapping(
+        twitter_username: str, bluesky_info: Optional[dict]
+    ) -> UserMapping:
+        """Build the mapping of a Twitter user from its ATProto info."""
+        if bluesky_info:
+            return UserMapping(
+                twitter_username=twitter_username,
+                atproto_username=bluesky_info.get('handle'),
+                description=bluesky_info.get('description'),
+                avatar_url=bluesky_info.get('avatar'),
+                did=bluesky_info.get('did'),
+            )
+        return UserMapping(
+            twitter_username=twitter_username,
+            atproto_username='',
+            description='',
+            avatar_url=None,
+            did='',
+        )
+
+    def _followed_cache_file(self) -> Path:
+        return (
+            self.cache_dir
+            / f"followed_{self.follow_client.me.did.replace(':', '_')}.cbor"
+        )
+
+    def cached_followed(self) -> Set[str]:
+        """Get the followed users cached by the last refresh, without fetching."""
+        return set(self._load_cache(self._followed_cache_file()).get('dids', []))
+
+    @Slot()
+    def refresh_followed(self) -> None:
+        """Fetch the followed users and emit the updated set."""
+        client = self.follow_client
+        cache_file = self._followed_cache_file()
         try:
-            followed = self.client.app.bsky.graph.follow.list(
-                repo=self.client.me.did,
-                params={'limit': 1000},
+            cached = self._load_cache(cache_file)
+            known_dids = set(cached.get('dids', []))
+            full_refresh = (
+                time.time() - cached.get('last_refresh', 0)
+                > self.FOLLOWED_REFRESH_INTERVAL
             )
-            return {record for record in followed.records}
+            if full_refresh:
+                # Only a complete walk can drop users that were unfollowed
+                followed_dids = set()
+                last_refresh = int(time.time())
+            else:
+                followed_dids = set(known_dids)
+                last_refresh = cached['last_refresh']
+
+            cursor = None
+            while True:
+                if self._interruption_requested():
+                    return
+                followed = client.app.bsky.graph.follow.list(
+                    repo=client.me.did,
+                    limit=100,
+                    cursor=cursor,
+                )
+                # records maps each follow record's URI to the record itself
+                page_dids = set(
+                    map(attrgetter('subject'), followed.records.values())
+                )
+                followed_dids |= page_dids
+                # Follows are listed newest first, so everything after a
+                # follow we already know about is cached as well
+                if not full_refresh and page_dids & known_dids:
+                    break
+                cursor = followed.cursor
+                if not cursor:
+                    break
+
+            self._save_cache(
+                cache_file,
+                {'dids': sorted(followed_dids), 'last_refresh': last_refresh},
+            )
+            self.followed_updated.emit(followed_dids)
         except Exception as e:
             error_message = f"Error fetching followed users: {e}\n{traceback.format_exc()}"
             print(error_message)
-            self.error_occurred.emit(error_message, 'error')
-            return set()  # Return an empty set to avoid further issues
+            self.error_occurred.emit(error_message)
 
     @Slot()
     def process_users(self) -> None:
@@ -270,125 +899,38 @@ class TwitterBlueskyMapper(QObject):
         try:
             # Load user entries
             try:
-                user_entries = self.load_user_entries(self.input_file)
+                user_links = self.load_user_links(self.input_file)
             except Exception as e:
                 error_message = f"Error loading user entries: {e}\n{traceback.format_exc()}"
                 print(error_message)
                 self.critical_error_occurred.emit(error_message)
                 return  # Halt processing
 
-            user_links = [
-                entry.get('following', {}).get('userLink')
-                for entry in user_entries
-                if entry.get('following', {}).get('userLink')
-            ]
-            total_users = len(user_links)
-            self.progress_update.emit(0, total_users)
-            current_user = 0
-
-            twitter_usernames = {}
-
-            # Initialize Chrome driver
-            options = uc.ChromeOptions()
-            options.headless = True
-            options.add_argument('--no-sandbox')
-            options.add_argument('--disable-dev-shm-usage')
-            options.add_argument('--disable-gpu')
-            options.add_argument('--disable-extensions')
-            # Enable performance logging
-            options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
-            try:
-                driver = uc.Chrome(
-                    driver_executable_path=chromedriver_path,
-                    options=options,
-                    use_subprocess=True,
-                    version_main=130,
-                )
-            except Exception as e:
-                error_message = f"Error initializing Chrome driver: {e}\n{traceback.format_exc()}"
-                print(error_message)
-                self.critical_error_occurred.emit(error_message)
-                return  # Halt processing
+            with self._progress_lock:
+                self._progress_done = 0
+                self._progress_total = len(user_links)
 
+            # Users resolved on a previous run need neither Chrome nor Bluesky
+            uncached_links = []
             for user_link in user_links:
-                QApplication.processEvents()
-                twitter_username = self.get_twitter_username(
-                    driver, user_link
-                )
-                if twitter_username:
-                    twitter_usernames[user_link] = twitter_username
-
-                    # Emit mapping with Twitter username and any cached atproto data
-                    with QMutexLocker(self.bluesky_mutex):
-                        bluesky_info = self.bluesky_cache.get(
-                            twitter_username
-                        )
-                    if bluesky_info:
-                        mapping = UserMapping(
-                            twitter_username=twitter_username,
-                            atproto_username=bluesky_info.get('handle'),
-                            description=bluesky_info.get('description'),
-                            avatar_url=bluesky_info.get('avatar'),
-                            did=bluesky_info.get('did'),
+                twitter_username = self.twitter_cache.get(user_link)
+                if twitter_username in self.bluesky_cache:
+                    self.new_mapping.emit(
+                        self._make_mapping(
+                            twitter_username,
+                            self.bluesky_cache[twitter_username],
                         )
-                    else:
-                        mapping = UserMapping(
-                            twitter_username=twitter_username,
-                            atproto_username='',
-                            description='',
-                            avatar_url=None,
-                            did='',
-                        )
-                    self.new_mapping.emit(mapping)
-
-                current_user += 1
-                self.progress_update.emit(current_user, total_users)
-                QApplication.processEvents()
-            driver.quit()
-            # Now we have twitter_usernames mapping user_link -> twitter_username
-
-            # Collect Twitter usernames and see which ones we have Bluesky info for
-            twitter_usernames_set = set(twitter_usernames.values())
-
-            missing_twitter_usernames = []
-            with QMutexLocker(self.bluesky_mutex):
-                for twitter_username in twitter_usernames_set:
-                    if twitter_username not in self.bluesky_cache:
-                        missing_twitter_usernames.append(twitter_username)
-
-            # Now login to Bluesky
-            self.error_occurred.emit('Logging into Bluesky...', 'info')
-            try:
-                self.client = Client()
-                self.client.login(
-                    login=self.login,
-                    password=self.password,
-                )
-            except Exception as e:
-                error_message = f"Error logging into Bluesky: {e}\n{traceback.format_exc()}"
-                print(error_message)
-                self.critical_error_occurred.emit(error_message)
-                return  # Halt processing
-
-            self.error_occurred.emit('Logged into Bluesky.', 'info')
-
-            # Now process missing Twitter usernames
-            total_missing = len(missing_twitter_usernames)
-            for idx, twitter_username in enumerate(
-                missing_twitter_usernames, 1
-            ):
-                data = self.get_atproto_user_info(twitter_username)
-                if data:
-                    mapping = UserMapping(
-                        twitter_username=twitter_username,
-                        atproto_username=data.get('handle'),
-                        description=data.get('description'),
-                        avatar_url=data.get('avatar'),
-                        did=data.get('did'),
                     )
-                    # Update the mapping
-                    self.new_mapping.emit(mapping)
-                self.progress_update.emit(idx, total_missing)
+                else:
+                    uncached_links.append(user_link)
+            self._advance_progress(done=len(user_links) - len(uncached_links))
+
+            # Chrome and Bluesky lookups overlap, each resolved user is
+            # looked up while the next link is being resolved
+            if uncached_links and not asyncio.run(
+                self._map_users(uncached_links)
+            ):
+                return  # Halt processing
 
             # Emit mapping_complete signal
             self.mapping_complete.emit()
@@ -398,24 +940,217 @@ class TwitterBlueskyMapper(QObject):
             print(error_message)
             self.critical_error_occurred.emit(error_message)
         finally:
-            if self.client:
-                del self.client
+            if self.driver is not None:
+                self.driver.quit()
+                self.driver = None
+            self.flush_caches()
+
+
+class MappingModel(QAbstractTableModel):
+    """Table model keeping each column of the mappings in its own list."""
+
+    HEADERS = [
+        'Avatar',
+        'Twitter Username',
+        'Bluesky Username',
+        'Description',
+        'Select',
+    ]
+    AVATAR_COLUMN = 0
+    SELECT_COLUMN = 4
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.twitter_usernames: List[str] = []
+        self.atproto_usernames: List[str] = []
+        self.descriptions: List[Optional[str]] = []
+        self.dids: List[str] = []
+        self.avatars: List[Optional[QPixmap]] = []
+        self.checked: List[bool] = []
+        self.enabled: List[bool] = []
+        self.followed: List[bool] = []
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.twitter_usernames)
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def data(self, index: QModelIndex, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if column == self.AVATAR_COLUMN:
+            if role == Qt.ItemDataRole.DecorationRole:
+                return self.avatars[row]
+        elif column == self.SELECT_COLUMN:
+            if role == Qt.ItemDataRole.CheckStateRole:
+                return (
+                    Qt.CheckState.Checked
+                    if self.checked[row]
+                    else Qt.CheckState.Unchecked
+                )
+            if role == Qt.ItemDataRole.DisplayRole and self.followed[row]:
+                return 'Followed'
+        elif role == Qt.ItemDataRole.DisplayRole:
+            if column == 1:
+                return self.twitter_usernames[row]
+            if column == 2:
+                return self.atproto_usernames[row]
+            if column == 3:
+                return self.descriptions[row]
+        return None
+
+    def setData(self, index: QModelIndex, value, role=Qt.ItemDataRole.EditRole):
+        if (
+            index.isValid()
+            and index.column() == self.SELECT_COLUMN
+            and role == Qt.ItemDataRole.CheckStateRole
+        ):
+            self.set_checked(
+                index.row(), Qt.CheckState(value) == Qt.CheckState.Checked
+            )
+            return True
+        return False
+
+    def flags(self, index: QModelIndex):
+        flags = Qt.ItemFlag.ItemIsSelectable | Qt.ItemFlag.ItemIsEnabled
+        if index.isValid() and index.column() == self.SELECT_COLUMN:
+            flags = Qt.ItemFlag.ItemIsUserCheckable
+            if self.enabled[index.row()]:
+                flags |= Qt.ItemFlag.ItemIsEnabled
+        return flags
+
+    def headerData(
+        self, section: int, orientation, role=Qt.ItemDataRole.DisplayRole
+    ):
+        if (
+            orientation == Qt.Orientation.Horizontal
+            and role == Qt.ItemDataRole.DisplayRole
+        ):
+            return self.HEADERS[section]
+        return None
+
+    def add_mappings(
+        self, mappings: List[UserMapping], checked: List[bool]
+    ) -> None:
+        """Append rows for the mappings, disabled until mapping completes."""
+        first_row = len(self.twitter_usernames)
+        self.beginInsertRows(
+            QModelIndex(), first_row, first_row + len(mappings) - 1
+        )
+        for mapping, is_checked in zip(mappings, checked):
+            self.twitter_usernames.append(mapping.twitter_username)
+            self.atproto_usernames.append(mapping.atproto_username)
+            self.descriptions.append(mapping.description)
+            self.dids.append(mapping.did)
+            self.avatars.append(None)
+            self.checked.append(is_checked)
+            self.enabled.append(False)
+            self.followed.append(False)
+        self.endInsertRows()
+
+    def _select_changed(self, first_row: int, last_row: int) -> None:
+        self.dataChanged.emit(
+            self.index(first_row, self.SELECT_COLUMN),
+            self.index(last_row, self.SELECT_COLUMN),
+        )
+
+    def set_avatar(self, row: int, pixmap: QPixmap) -> None:
+        self.avatars[row] = pixmap
+        index = self.index(row, self.AVATAR_COLUMN)
+        self.dataChanged.emit(index, index)
+
+    def set_checked(self, row: int, checked: bool) -> None:
+        self.checked[row] = checked
+        self._select_changed(row, row)
+
+    def set_enabled(self, row: int, enabled: bool) -> None:
+        self.enabled[row] = enabled
+        self._select_changed(row, row)
+
+    def set_followed(self, row: int) -> None:
+        self.followed[row] = True
+        self.enabled[row] = False
+        self._select_changed(row, row)
+
+    def check_all(self) -> None:
+        if self.checked:
+            self.checked = [True] * len(self.checked)
+            self._select_changed(0, len(self.checked) - 1)
+
+    def check_dids(self, dids: Set[str]) -> None:
+        """Check the rows of the given Bluesky accounts."""
+        if self.dids:
+            self.checked = [
+                checked or did in dids
+                for checked, did in zip(self.checked, self.dids)
+            ]
+            self._select_changed(0, len(self.dids) - 1)
+
+    def enable_rows_with_did(self) -> None:
+        """Enable the checkbox of every row that has a Bluesky account."""
+        if self.dids:
+            self.enabled = [
+                enabled or bool(did)
+                for enabled, did in zip(self.enabled, self.dids)
+            ]
+            self._select_changed(0, len(self.dids) - 1)
 
 
 class MainWindow(QMainWindow):
+    # Maximum number of mappings added to the table at once
+    MAPPING_BATCH_SIZE = 16
+    # Delay for mappings streaming in to gather into a batch
+    MAPPING_FLUSH_DELAY = 100  # milliseconds
+    # Maximum number of avatars kept in memory for reuse, the rest are
+    # reloaded from the on-disk cache
+    AVATAR_CACHE_SIZE = 512
+    # Number of avatars downloaded in parallel
+    AVATAR_THREAD_COUNT = 16
+    # Attempts and initial delay of the follow retries on rate limits
+    FOLLOW_MAX_RETRIES = 5
+    FOLLOW_RETRY_DELAY = 1  # seconds
+    # Time given to the worker to stop when the window is closed
+    WORKER_STOP_TIMEOUT = 2000  # milliseconds
+    # Interval between two reads of the worker's progress, about 30 Hz
+    PROGRESS_POLL_INTERVAL = 33  # milliseconds
+
+    # Carries error messages to the GUI thread, where the dialog is shown
+    _error_signal = Signal(str)
+
     def __init__(self):
         super().__init__()
+        self._error_signal.connect(
+            self._show_error_message_impl, Qt.ConnectionType.QueuedConnection
+        )
         self.setWindowTitle('Twitter to Bluesky Mapper')
         self.resize(800, 600)
         self.setMaximumSize(1200, 600)
 
         # Initialize member variables
         self.followed_dids: Set[str] = set()
-        self.avatar_cache: dict = {}
+        # Follows made here, which a refresh already under way may miss
+        self.followed_this_session: Set[str] = set()
+        self.avatar_cache: LRUCache = LRUCache(self.AVATAR_CACHE_SIZE)
         self.client: Optional[Client] = None
         self.logged_in_user: str = ''
         self.twitter_username_to_row: Dict[str, int] = {}
-        self.row_to_mapping: Dict[int, UserMapping] = {}
+        self.pending_mappings: List[UserMapping] = []
+        # Last progress shown, to skip redundant repaints
+        self._last_progress: Optional[Tuple[int, int]] = None
+        self._last_total = -1
+        self._last_msg: Optional[str] = None
+        self._progress_suffix = ' - The UI may be unresponsive during this time.'
+        # Rows waiting for an avatar that is still being fetched
+        self.avatar_rows: Dict[str, List[int]] = {}
+        self.avatar_dir = Path('cache') / 'avatars'
+        self.avatar_dir.mkdir(parents=True, exist_ok=True)
+        self.avatar_pool = QThreadPool(self)
+        self.avatar_pool.setMaxThreadCount(self.AVATAR_THREAD_COUNT)
+        self.avatar_signals = AvatarSignals()
+        self.avatar_signals.loaded.connect(self.set_avatar)
+        self.avatar_signals.failed.connect(self.discard_avatar_request)
 
         # Setup UI and login
         login_dialog = LoginDialog()
@@ -442,23 +1177,37 @@ class MainWindow(QMainWindow):
         # Initialize the worker
         self.worker_thread = QThread()
         self.worker = TwitterBlueskyMapper(
-            login=self.bluesky_login,
-            password=self.bluesky_password,
+            self.client,
             input_file='./data/following.json',
         )
         self.worker.moveToThread(self.worker_thread)
-        self.worker.new_mapping.connect(self.add_mapping_to_table)
-        self.worker.error_occurred.connect(self.update_status_message)
-        self.worker.progress_update.connect(self.update_progress)
+        self.worker.new_mapping.connect(self.queue_mapping)
+        # Plain status messages go straight to the status bar's own slot
+        self.worker.status_message.connect(
+            self.status_bar.showMessage, Qt.ConnectionType.QueuedConnection
+        )
+        self.worker.error_occurred.connect(self.show_worker_error)
         self.worker.mapping_complete.connect(self.enable_checkboxes)
         self.worker.critical_error_occurred.connect(self.handle_critical_error)
-
+        self.worker.followed_updated.connect(self.update_followed_dids)
+        # Start from the last known follows, the worker refreshes them
+        self.followed_dids = self.worker.cached_followed()
+
+        self._progress_timer = QTimer(self)
+        self._progress_timer.setInterval(self.PROGRESS_POLL_INTERVAL)
+        self._progress_timer.timeout.connect(self._poll_progress)
+        self.worker_thread.finished.connect(self._progress_timer.stop)
+        # The thread itself stays alive, destroying it counts as a failure
+        self.worker_thread.finished.connect(self.worker.deleteLater)
         # Handle unexpected thread termination
-        self.worker_thread.finished.connect(self.handle_worker_finished)
         self.worker_thread.destroyed.connect(self.handle_worker_terminated)
 
         self.worker_thread.started.connect(self.worker.process_users)
+        # Connected after process_users, so the follow list is only walked
+        # once mapping is done and never holds back mapping_complete
+        self.worker_thread.started.connect(self.worker.refresh_followed)
         self.worker_thread.start()
+        self._progress_timer.start()
 
         # Progress tracking
         self.progress_bar = QProgressBar()
@@ -485,26 +1234,24 @@ class MainWindow(QMainWindow):
         if following_js.exists():
             # make a backup of the original file
             following_js_backup = data_path / "following.js.bak"
-            following_js_backup.touch(exist_ok=True)
-            with following_js.open("r") as f:
-                with following_js_backup.open("w") as f_backup:
-                    f_backup.write(f.read())
-
-            with following_js.open("r+") as f:
-                with following_json.open("w") as json_f:
-                    current_value = f.read()
-                    if not current_value:
+            shutil.copyfile(following_js, following_js_backup)
+
+            # Only the assignment in front of the JSON needs stripping, so
+            # the rest is copied over in chunks instead of read into memory
+            prefix = b"window.YTD.following.part0 = "
+            with following_js.open("rb") as f:
+                with following_json.open("wb") as json_f:
+                    head = f.read(len(prefix))
+                    if not head:
                         # Show error message and exit
                         self.show_error_message(
                             "Please copy the `data` folder from your Twitter data export to the same directory as this script."
                         )
                         sys.exit()
 
-                    current_value = current_value.strip().replace(
-                        "window.YTD.following.part0 = ", ""
-                    )
-                    json_f.seek(0)
-                    json_f.write(current_value)
+                    if head != prefix:
+                        json_f.write(head)
+                    shutil.copyfileobj(f, json_f, length=1 << 20)
 
     def setup_ui(self):
         """Initialize and setup all UI components"""
@@ -518,36 +1265,30 @@ class MainWindow(QMainWindow):
         self.layout.addWidget(self.logged_in_user_label)
 
         # Create table
-        self.table_widget = QTableWidget()
-        self.table_widget.setColumnCount(5)
-        self.table_widget.setHorizontalHeaderLabels(
-            [
-                'Avatar',
-                'Twitter Username',
-                'Bluesky Username',
-                'Description',
-                'Select',
-            ]
-        )
+        self.mapping_model = MappingModel(self)
+        self.table_view = QTableView()
+        self.table_view.setModel(self.mapping_model)
+        self.table_view.setIconSize(QSize(50, 50))
 
         # Configure table properties
-        header = self.table_widget.horizontalHeader()
+        header = self.table_view.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         header.setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(2, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(3, QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(4, QHeaderView.ResizeMode.Fixed)
-        self.table_widget.setColumnWidth(0, 60)
-        self.table_widget.setColumnWidth(4, 60)
+        self.table_view.setColumnWidth(0, 60)
+        self.table_view.setColumnWidth(4, 60)
 
-        # Minimum row size to fit the avatar
-        self.table_widget.verticalHeader().setDefaultSectionSize(60)
+        # Fixed row size to fit the avatar, rows are never resized to contents
+        vertical_header = self.table_view.verticalHeader()
+        vertical_header.setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        vertical_header.setDefaultSectionSize(60)
 
-        # Ensure the rows will be resized to fit the content and at least the size of the Avatar
-        self.table_widget.setSizeAdjustPolicy(
-            QTableWidget.SizeAdjustPolicy.AdjustToContents
+        self.table_view.setSizeAdjustPolicy(
+            QTableView.SizeAdjustPolicy.AdjustToContents
         )
-        self.table_widget.setMinimumSize(1200, 600)
+        self.table_view.setMinimumSize(1200, 600)
 
         # Add "Check All" button
         self.check_all_button = QPushButton('Check All')
@@ -566,85 +1307,80 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self.status_bar)
 
         # Enable row-click for check/uncheck
-        self.table_widget.cellClicked.connect(self.toggle_row_check)
-        self.layout.addWidget(self.table_widget)
+        self.table_view.clicked.connect(self.toggle_row_check)
+        self.layout.addWidget(self.table_view)
 
     @Slot(UserMapping)
-    def add_mapping_to_table(self, mapping: UserMapping):
-        """Add a new mapping entry to the table with auto-check for 95% matches"""
-        try:
-            row = self.table_widget.rowCount()
-            self.table_widget.insertRow(row)
-            self.twitter_username_to_row[mapping.twitter_username] = row
-
-            # Create widgets
-            avatar_label = QLabel()
-            avatar_label.setFixedSize(50, 50)
-            avatar_label.setAlignment(Qt.AlignmentFlag.AlignCenter)
-
-            # Set widgets and items
-            self.table_widget.setCellWidget(row, 0, avatar_label)
-            self.table_widget.setItem(
-                row, 1, QTableWidgetItem(mapping.twitter_username)
-            )
-            self.table_widget.setItem(
-                row, 2, QTableWidgetItem(mapping.atproto_username)
-            )
-            self.table_widget.setItem(
-                row, 3, QTableWidgetItem(mapping.description)
+    def queue_mapping(self, mapping: UserMapping):
+        """Queue a mapping to be added to the table with the next batch"""
+        self.pending_mappings.append(mapping)
+        if len(self.pending_mappings) == 1:
+            QTimer.singleShot(
+                self.MAPPING_FLUSH_DELAY, self.flush_pending_mappings
             )
 
-            checkbox = QCheckBox()
-            # Automatically check based on match percentage or already followed users
-            is_followed = mapping.did in self.followed_dids
-            if (
-                is_followed
-                or fuzz.ratio(
-                    mapping.twitter_username, mapping.atproto_username
-                )
-                >= 95
-            ):
-                checkbox.setChecked(True)
-            checkbox.setEnabled(False)
-            checkbox_layout = QHBoxLayout()
-            checkbox_layout.setAlignment(Qt.AlignmentFlag.AlignCenter)
-            checkbox_layout.addWidget(checkbox)
-            checkbox_widget = QWidget()
-            checkbox_widget.setLayout(checkbox_layout)
-            self.table_widget.setCellWidget(row, 4, checkbox_widget)
+    @Slot()
+    def flush_pending_mappings(self):
+        """Add a batch of queued mappings to the table"""
+        batch = self.pending_mappings[: self.MAPPING_BATCH_SIZE]
+        del self.pending_mappings[: self.MAPPING_BATCH_SIZE]
+        if not batch:
+            return
+        if self.pending_mappings:
+            QTimer.singleShot(0, self.flush_pending_mappings)
 
-            # Store mapping
-            self.row_to_mapping[row] = mapping
+        self.add_mappings_to_table(batch)
 
-            # Schedule avatar fetch if needed
-            if mapping.avatar_url:
-                self.fetch_avatar(mapping.avatar_url, avatar_label)
+    def add_mappings_to_table(self, mappings: List[UserMapping]):
+        """Add new mapping entries to the table with auto-check for 95% matches"""
+        try:
+            first_row = self.mapping_model.rowCount()
+            # Repaint once for the whole batch, including cached avatars
+            self.table_view.setUpdatesEnabled(False)
+            # Automatically check based on match percentage or already followed users.
+            # With a score_cutoff rapidfuzz bails out early on poor matches.
+            ratio = fuzz.ratio
+            followed_dids = self.followed_dids
+            checked = [
+                mapping.did in followed_dids
+                or bool(
+                    ratio(
+                        mapping.twitter_username,
+                        mapping.atproto_username,
+                        score_cutoff=95,
+                    )
+                )
+                for mapping in mappings
+            ]
+            self.mapping_model.add_mappings(mappings, checked)
 
-            # Ensure table updates
-            self.table_widget.viewport().update()
+            for row, mapping in enumerate(mappings, first_row):
+                self.twitter_username_to_row[mapping.twitter_username] = row
+                # Schedule avatar fetch if needed
+                if mapping.avatar_url:
+                    self.fetch_avatar(mapping.avatar_url, row)
 
         except Exception as e:
             self.show_error_message(f'Error updating table: {str(e)}')
+        finally:
+            self.table_view.setUpdatesEnabled(True)
 
-    @Slot(int, int)
-    def toggle_row_check(self, row: int, column: int):
+    @Slot(QModelIndex)
+    def toggle_row_check(self, index: QModelIndex):
         """Toggle the checkbox in a row when the row is clicked"""
+        row = index.row()
         if (
-            column != 4
+            index.column() != MappingModel.SELECT_COLUMN
         ):  # Ensure it doesn't conflict with the checkbox column itself
-            checkbox_widget = self.table_widget.cellWidget(row, 4)
-            checkbox = checkbox_widget.findChild(QCheckBox) if checkbox_widget else None
-            if checkbox and checkbox.isEnabled():
-                checkbox.setChecked(not checkbox.isChecked())
+            if self.mapping_model.enabled[row]:
+                self.mapping_model.set_checked(
+                    row, not self.mapping_model.checked[row]
+                )
 
     @Slot()
     def check_all_users(self):
         """Check all checkboxes in the table"""
-        for row in range(self.table_widget.rowCount()):
-            checkbox_widget = self.table_widget.cellWidget(row, 4)
-            checkbox = checkbox_widget.findChild(QCheckBox) if checkbox_widget else None
-            if checkbox:
-                checkbox.setChecked(True)
+        self.mapping_model.check_all()
 
     def get_client(self) -> Client:
         """Get an authenticated Bluesky client"""
@@ -661,166 +1397,203 @@ class MainWindow(QMainWindow):
 
         return self.client
 
-    def fetch_avatar(self, url: str, avatar_label: QLabel) -> None:
-        """Fetch and cache avatar images"""
-        if url in self.avatar_cache:
-            pixmap = self.avatar_cache[url]
-            avatar_label.setPixmap(pixmap)
+    def fetch_avatar(self, url: str, row: int) -> None:
+        """Fetch and cache avatar images without blocking the UI"""
+        pixmap = self.avatar_cache.get(url)
+        if pixmap is not None:
+            self.mapping_model.set_avatar(row, pixmap)
             return
 
-        try:
-            response = httpx.get(url, timeout=10)
-            response.raise_for_status()
-            if response.headers.get('Content-Type', '').startswith('image/'):
-                data = response.content
-                pixmap = QPixmap()
-                if pixmap.loadFromData(data):
-                    scaled_pixmap = pixmap.scaled(
-                        50,
-                        50,
-                        aspectMode=Qt.AspectRatioMode.KeepAspectRatio,
-                        mode=Qt.TransformationMode.SmoothTransformation,
-                    )
-                    self.avatar_cache[url] = scaled_pixmap
-                    avatar_label.setPixmap(scaled_pixmap)
-        except httpx.RequestError as e:
-            print(f'Network error fetching avatar: {e}')
-        except Exception as e:
-            print(f'Error fetching avatar: {e}')
+        # Rows asking for an avatar that is already being fetched share it
+        if url in self.avatar_rows:
+            self.avatar_rows[url].append(row)
+            return
+
+        self.avatar_rows[url] = [row]
+        cache_name = hashlib.blake2b(url.encode()).hexdigest()[:16]
+        self.avatar_pool.start(
+            AvatarLoader(
+                url,
+                self.avatar_dir / f'{cache_name}.png',
+                _AVATAR_CLIENT,
+                self.avatar_signals,
+            )
+        )
+
+    @Slot(str, QImage)
+    def set_avatar(self, url: str, image: QImage) -> None:
+        """Cache a fetched avatar and show it on the rows waiting for it"""
+        pixmap = QPixmap.fromImage(image)
+        self.avatar_cache.put(url, pixmap)
+        for row in self.avatar_rows.pop(url, []):
+            self.mapping_model.set_avatar(row, pixmap)
+
+    @Slot(str)
+    def discard_avatar_request(self, url: str) -> None:
+        """Forget a failed avatar fetch so later rows can retry it"""
+        self.avatar_rows.pop(url, None)
 
     def follow_selected_users(self):
         """Follow the selected users"""
         try:
-            for row in range(self.table_widget.rowCount()):
-                checkbox_widget = self.table_widget.cellWidget(row, 4)
-                checkbox = checkbox_widget.findChild(QCheckBox) if checkbox_widget else None
-                if checkbox and checkbox.isChecked():
-                    mapping = self.row_to_mapping.get(row)
-                    if (
-                        mapping
-                        and mapping.did
-                        and mapping.did not in self.followed_dids
-                    ):
+            model = self.mapping_model
+            for row in range(model.rowCount()):
+                if model.checked[row]:
+                    did = model.dids[row]
+                    if did and did not in self.followed_dids:
                         # Disable the checkbox to prevent multiple follows
-                        checkbox.setEnabled(False)
-                        self.follow_user(mapping.did, row)
+                        model.set_enabled(row, False)
+                        self.follow_user(did, row)
         except Exception as e:
             self.show_error_message(f'Error following selected users: {str(e)}')
 
     def follow_user(self, did: str, row: int):
         """Follow a user with retry logic for rate limits."""
+        self.status_bar.showMessage(f'Attempting to follow user {did}')
+        self._attempt_follow(did, row, 0, self.FOLLOW_RETRY_DELAY)
+
+    def _attempt_follow(
+        self, did: str, row: int, attempt: int, retry_delay: int
+    ) -> None:
+        """Try to follow a user, scheduling a retry when rate limited."""
         try:
             client = self.get_client()
-            max_retries = 5
-            retry_delay = 1  # Initial delay in seconds
-
-            self.status_bar.showMessage(f'Attempting to follow user {did}')
-
-            for attempt in range(max_retries):
-                try:
-                    client.app.bsky.graph.follow.create(
-                        record=models.AppBskyGraphFollow.Record(
-                            subject=did,
-                            created_at=datetime.now(tz=timezone.utc).strftime(
-                                '%Y-%m-%dT%H:%M:%SZ'
-                            ),
-                        ),
-                        repo=client.me.did,
-                    )
-                    self.followed_dids.add(did)
-                    self.status_bar.showMessage(
-                        f'Successfully followed user {did}'
-                    )
-                    # Update UI to reflect that the user is followed
-                    checkbox_widget = self.table_widget.cellWidget(row, 4)
-                    checkbox = checkbox_widget.findChild(QCheckBox) if checkbox_widget else None
-                    if checkbox:
-                        checkbox.setText('Followed')
-                        checkbox.setEnabled(False)
-                    return
-
-                except Exception as e:
-                    if '429' in str(e):  # Rate limit error
-                        if attempt < max_retries - 1:
-                            self.status_bar.showMessage(
-                                f'Rate limited. Retrying in {retry_delay} seconds...'
-                            )
-                            for _ in range(retry_delay):
-                                QApplication.processEvents()
-                                time.sleep(1)
-                            retry_delay *= 2  # Exponential backoff
-                            continue
-                    raise e
+            client.app.bsky.graph.follow.create(
+                record=models.AppBskyGraphFollow.Record(
+                    subject=did,
+                    created_at=_utcnow_z(),
+                ),
+                repo=client.me.did,
+            )
+            self.followed_dids.add(did)
+            self.followed_this_session.add(did)
+            self.status_bar.showMessage(f'Successfully followed user {did}')
+            # Update UI to reflect that the user is followed
+            self.mapping_model.set_followed(row)
 
         except Exception as e:
+            # Rate limit error
+            if '429' in str(e) and attempt < self.FOLLOW_MAX_RETRIES - 1:
+                self.status_bar.showMessage(
+                    f'Rate limited. Retrying in {retry_delay} seconds...'
+                )
+                # Retry from the event loop so the UI stays responsive
+                QTimer.singleShot(
+                    retry_delay * 1000,
+                    partial(
+                        self._attempt_follow,
+                        did,
+                        row,
+                        attempt + 1,
+                        retry_delay * 2,  # Exponential backoff
+                    ),
+                )
+                return
             self.show_error_message(f'Error following user: {str(e)}')
             self.status_bar.showMessage(f'Error following user {did}')
 
     @Slot()
     def enable_checkboxes(self):
         """Enable the checkboxes after mapping is complete."""
-        for row in range(self.table_widget.rowCount()):
-            QApplication.processEvents()
-            checkbox_widget = self.table_widget.cellWidget(row, 4)
-            checkbox = checkbox_widget.findChild(QCheckBox) if checkbox_widget else None
-            if checkbox:
-                mapping = self.row_to_mapping.get(row)
-                if mapping and mapping.did:
-                    checkbox.setEnabled(True)
+        self._poll_progress()
+        self._progress_timer.stop()
+        while self.pending_mappings:
+            self.flush_pending_mappings()
+        self.mapping_model.enable_rows_with_did()
         self.follow_selected_button.setEnabled(True)
         self.status_bar.showMessage('Mapping complete.')
 
-    @Slot(str)
+    @Slot(object)
+    def update_followed_dids(self, followed_dids: Set[str]):
+        """Replace the followed users with the ones fetched by the worker"""
+        self.followed_dids = followed_dids | self.followed_this_session
+        # Rows added before the refresh are auto-checked like new ones
+        self.mapping_model.check_dids(self.followed_dids)
+
     def show_error_message(self, message: str):
         """Display error message to user with detailed traceback"""
+        # Startup errors must be shown before exiting, so the dialog is only
+        # deferred when called from another thread
+        if QThread.currentThread() is self.thread():
+            self._show_error_message_impl(message)
+        else:
+            self._error_signal.emit(message)
+
+    @Slot(str)
+    def _show_error_message_impl(self, message: str):
         QMessageBox.critical(self, 'Error', message)
 
-    @Slot(int, int)
+    @Slot()
+    def _poll_progress(self):
+        """Show the worker's progress if it changed since the last poll"""
+        progress = self.worker.progress()
+        if progress != self._last_progress:
+            self._last_progress = progress
+            self.update_progress(*progress)
+
     def update_progress(self, current: int, total: int):
         """Update the progress bar"""
-        if total == 0:
-            self.progress_bar.setRange(0, 0)
-        else:
+        if total != self._last_total:
+            self._last_total = total
             self.progress_bar.setRange(0, total)
+        if total:
             self.progress_bar.setValue(current)
-            self.status_bar.showMessage(f'Processing {current}/{total} - The UI may be unresponsive during this time.')
+            msg = f'Processing {current}/{total}'
+            if msg != self._last_msg:
+                self._last_msg = msg
+                self.status_bar.showMessage(msg + self._progress_suffix)
             self.progress_bar.show()
 
-    @Slot(str, str)
-    def update_status_message(self, message: str, level: str = 'info'):
-        """Update the status bar message."""
-        if level == 'error':
-            self.status_bar.showMessage(f'Error: {message}')
-        else:
-            self.status_bar.showMessage(message)
+    @Slot(str)
+    def show_worker_error(self, message: str):
+        """Show a non-critical worker error in the status bar."""
+        # The next progress tick has to replace this message again
+        self._last_msg = None
+        self.status_bar.showMessage(f'Error: {message}')
 
     @Slot(str)
     def handle_critical_error(self, message: str):
         """Handle critical errors from the worker."""
-        self.show_error_message(message)
+        # Let the worker unwind on its own instead of blocking on it
+        self.worker_thread.requestInterruption()
         self.worker_thread.quit()
-        self.worker_thread.wait()
-
-    @Slot()
-    def handle_worker_finished(self):
-        """Handle normal worker thread completion."""
-        # You can add any cleanup or UI updates here
-        pass
+        self._error_signal.emit(message)
 
     @Slot()
     def handle_worker_terminated(self):
         """Handle unexpected worker thread termination."""
-        self.show_error_message("The processing thread was terminated unexpectedly.")
+        self._error_signal.emit(
+            "The processing thread was terminated unexpectedly."
+        )
         # Perform any necessary cleanup
 
     def closeEvent(self, event):
         """Clean up resources when window is closed"""
         try:
-            if self.client:
-                del self.client
             if self.worker_thread.isRunning():
+                # Don't hang the close on a worker stuck in a blocking call
+                self.worker_thread.requestInterruption()
                 self.worker_thread.quit()
-                self.worker_thread.wait()
+                if not self.worker_thread.wait(self.WORKER_STOP_TIMEOUT):
+                    self.worker_thread.terminate()
+                    self.worker_thread.wait(500)
+            # A terminated or still scraping worker never reaches the
+            # cleanup in process_users, so Chrome would be left running
+            driver = self.worker.driver
+            if driver is not None:
+                try:
+                    driver.quit()
+                finally:
+                    self.worker.driver = None
+            self.avatar_pool.clear()
+            self.avatar_pool.waitForDone(2000)
+            _AVATAR_CLIENT.close()
+            # Only torn down once nothing can be using the session anymore
+            if self.client is not None:
+                try:
+                    self.client.request.close()
+                finally:
+                    self.client = None
             event.accept()
         except Exception as e:
             print(f'Error during cleanup: {e}')
@@ -831,7 +1604,4 @@ if __name__ == '__main__':
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
-    if 'driver' in locals():
-        driver.quit()   # noqa
-
     sys.exit(app.exec())
@@ -1,6 +1,7 @@
+from functools import lru_cache
 from pathlib import Path
 
-from pydantic_settings import BaseSettings
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
@@ -12,8 +13,13 @@ class Settings(BaseSettings):
     BLUESKY_LOGIN: str
     BLUESKY_PASSWORD: str
 
-    class Config:
-        env_file = ".env"
+    model_config = SettingsConfigDict(env_file=".env", frozen=True)
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Return the settings, reading `.env` only once per process"""
+    return Settings()
 
 
 class BlueSkyError(Exception):